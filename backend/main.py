@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import capm, stock_analysis, stock_prediction
+from services import admission
+from routers import backtest, capm, portfolio, stock_analysis, stock_prediction
 
 app = FastAPI(
     title="Stocklyzer API",
@@ -23,12 +24,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
 # Include routers
 app.include_router(capm.router, prefix="/api/capm", tags=["CAPM Calculator"])
 app.include_router(stock_analysis.router, prefix="/api/analysis", tags=["Stock Analysis"])
 app.include_router(stock_prediction.router, prefix="/api/prediction", tags=["Stock Prediction"])
+app.include_router(portfolio.router, prefix="/api/portfolio", tags=["Portfolio Analytics"])
+app.include_router(backtest.router, prefix="/api/backtest", tags=["Backtesting"])
 
 @app.get("/")
 async def root():
@@ -41,3 +45,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/admission")
+async def admission_status():
+    """Concurrency limits, queue depth and shedding counters of the heavy endpoints"""
+    return {"endpoints": admission.stats()}
@@ -7,15 +7,19 @@ class StockRequest(BaseModel):
     years: int = 1
 
 class CAPMRequest(StockRequest):
-    pass
+    max_points: Optional[int] = None  # downsample chart series to at most this many rows
 
 class StockAnalysisRequest(BaseModel):
     symbol: str
     period: str = "1y"  # 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
+    max_points: Optional[int] = None  # downsample price_data to at most this many points
+    interval: str = "1d"  # 1d, or intraday 1m, 5m, 15m, 30m, 1h (period 1d, 5d or 1mo)
 
 class StockPredictionRequest(BaseModel):
     symbol: str
     days: int = 30
+    mode: str = "auto"  # auto, fast, full
+    latency_budget_ms: Optional[int] = None
 
 class StockData(BaseModel):
     date: str
@@ -57,3 +61,67 @@ class StockPredictionResponse(BaseModel):
     historical_data: List[StockData]
     predictions: List[PredictionData]
     model_info: Dict[str, Any]
+
+class PortfolioRequest(StockRequest):
+    frontier_points: int = 50
+    risk_free_rate: float = 0.0
+
+class PortfolioWeights(BaseModel):
+    expected_return: float
+    volatility: float
+    sharpe_ratio: float
+    weights: Dict[str, float]
+
+class PortfolioResponse(BaseModel):
+    stocks: List[str]
+    observations: int
+    expected_returns: Dict[str, float]
+    volatilities: Dict[str, float]
+    covariance: List[List[float]]
+    correlation: List[List[float]]
+    shrinkage: float
+    min_variance: PortfolioWeights
+    max_sharpe: Optional[PortfolioWeights] = None  # None when the risk-free rate is above the minimum variance return
+    efficient_frontier: List[PortfolioWeights]
+    risk_free_rate: float
+
+class BacktestRequest(BaseModel):
+    symbols: List[str]
+    strategy: str = "ma_crossover"  # ma_crossover, rsi, macd, bollinger
+    period: str = "5y"
+    parameters: Dict[str, List[float]] = {}  # overrides of the default parameter grid
+    cost_bps: float = 0.0
+    top_n: int = 5
+    max_points: Optional[int] = 500  # downsample returned equity curves
+
+class EquityPoint(BaseModel):
+    date: str
+    equity: float
+
+class BacktestResult(BaseModel):
+    symbol: str
+    parameters: Dict[str, float]
+    total_return: float
+    annual_return: float
+    sharpe_ratio: float
+    max_drawdown: float
+    trades: int
+    equity_curve: List[EquityPoint]
+
+class BacktestGrid(BaseModel):
+    symbol: str
+    total_return: List[float]
+    annual_return: List[float]
+    sharpe_ratio: List[float]
+    max_drawdown: List[float]
+    trades: List[int]
+
+class BacktestResponse(BaseModel):
+    strategy: str
+    symbols: List[str]
+    start_date: str
+    end_date: str
+    configurations: int
+    parameters: Dict[str, List[float]]  # one entry per configuration, shared by every grid
+    grids: List[BacktestGrid]
+    best: List[BacktestResult]
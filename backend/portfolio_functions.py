@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from sklearn.covariance import ledoit_wolf
+
+TRADING_DAYS = 252
+
+
+#function to build the daily returns matrix (observations x assets) from close prices
+def returns_matrix(prices: pd.DataFrame) -> np.ndarray:
+    values = prices.to_numpy(dtype=np.float64)
+    return values[1:] / values[:-1] - 1.0
+
+
+#function to estimate annualized mean returns and Ledoit-Wolf shrunk covariance
+def shrunk_covariance(returns: np.ndarray):
+    """Return (mean returns, covariance, shrinkage intensity), annualized"""
+    mean = returns.mean(axis=0) * TRADING_DAYS
+    cov, shrinkage = ledoit_wolf(returns)
+    return mean, cov * TRADING_DAYS, float(shrinkage)
+
+
+#function to convert a covariance matrix to a correlation matrix
+def correlation(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diag(cov))
+    corr = cov / np.outer(std, std)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+#function to solve the covariance system once for the frontier constants
+def frontier_basis(mean: np.ndarray, cov: np.ndarray):
+    """
+    Solve cov @ x = [1, mean] with a single factorization. Every frontier
+    portfolio is a linear combination of these two solutions.
+    """
+    n = len(mean)
+    chol = np.linalg.cholesky(cov)
+    rhs = np.column_stack([np.ones(n), mean])
+    solved = np.linalg.solve(chol.T, np.linalg.solve(chol, rhs))
+    x_ones, x_mean = solved[:, 0], solved[:, 1]
+    a = x_ones.sum()
+    b = x_ones @ mean
+    c = x_mean @ mean
+    return x_ones, x_mean, a, b, c
+
+
+#function to trace the mean-variance efficient frontier for many target returns at once
+def efficient_frontier(mean: np.ndarray, cov: np.ndarray, target_returns: np.ndarray):
+    """
+    Minimum-variance fully invested portfolios (short sales allowed) for every
+    target return. Returns (weights of shape targets x assets, volatilities).
+    """
+    x_ones, x_mean, a, b, c = frontier_basis(mean, cov)
+    d = a * c - b * b
+    targets = np.asarray(target_returns, dtype=np.float64)
+    weights = (np.outer(c - b * targets, x_ones) + np.outer(a * targets - b, x_mean)) / d
+    variance = (a * targets ** 2 - 2 * b * targets + c) / d
+    return weights, np.sqrt(np.maximum(variance, 0.0))
+
+
+#function to compute the global minimum variance and maximum Sharpe portfolios
+def special_portfolios(mean: np.ndarray, cov: np.ndarray, risk_free_rate: float = 0.0):
+    """
+    Return (minimum variance weights, tangency weights). The tangency portfolio
+    only maximizes the Sharpe ratio when the minimum variance return is above
+    the risk-free rate; otherwise no fully invested portfolio has a maximal
+    Sharpe ratio and None is returned in its place.
+    """
+    x_ones, x_mean, a, b, c = frontier_basis(mean, cov)
+    min_variance = x_ones / a
+    excess = x_mean - risk_free_rate * x_ones
+    total = excess.sum()  # equals a * (b / a - risk_free_rate)
+    tangency = excess / total if total > 0 else None
+    return min_variance, tangency
+
+
+#function to summarize a set of weights as (expected return, volatility, sharpe)
+def portfolio_stats(weights: np.ndarray, mean: np.ndarray, cov: np.ndarray, risk_free_rate: float = 0.0):
+    expected = float(weights @ mean)
+    volatility = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+    sharpe = (expected - risk_free_rate) / volatility if volatility > 0 else 0.0
+    return expected, volatility, sharpe
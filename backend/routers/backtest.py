@@ -0,0 +1,121 @@
+from fastapi import APIRouter, HTTPException, Request
+from models.stock_models import BacktestRequest, BacktestResponse, BacktestGrid, BacktestResult, EquityPoint
+from services import admission, backtesting, downsampling, response_cache
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from typing import Dict, List
+
+router = APIRouter()
+
+def get_prices(symbols: List[str], period: str) -> pd.DataFrame:
+    """Download aligned close prices (dates x symbols) in a single request"""
+    data = admission.fetch(lambda timeout: yf.download(symbols, period=period, timeout=timeout))['Close']
+    if isinstance(data, pd.Series):
+        data = data.to_frame(name=symbols[0])
+    return data.reindex(columns=symbols).dropna(how='all').ffill()
+
+def build_backtest(request: BacktestRequest, grid: Dict[str, np.ndarray], prices: pd.DataFrame) -> BacktestResponse:
+    """Run the parameter grid over all symbols and collect metrics and the best equity curves"""
+    symbols = list(prices.columns)
+    close = prices.to_numpy(dtype=np.float64)
+    metrics = backtesting.backtest(close, request.strategy, grid, request.cost_bps)
+
+    grids = []
+    best = []
+    dates = prices.index
+    top_n = min(request.top_n, len(next(iter(grid.values()))))
+    for s, symbol in enumerate(symbols):
+        grids.append(BacktestGrid(
+            symbol=symbol,
+            total_return=np.round(metrics["total_return"][s], 4).tolist(),
+            annual_return=np.round(metrics["annual_return"][s], 4).tolist(),
+            sharpe_ratio=np.round(metrics["sharpe_ratio"][s], 4).tolist(),
+            max_drawdown=np.round(metrics["max_drawdown"][s], 4).tolist(),
+            trades=metrics["trades"][s].astype(int).tolist()
+        ))
+
+        # Equity curves only for the best configurations of each symbol
+        if top_n <= 0:
+            continue
+        order = np.argsort(-metrics["sharpe_ratio"][s], kind="stable")[:top_n]
+        sub_grid = {name: values[order] for name, values in grid.items()}
+        curves = backtesting.equity_curves(close[:, [s]], request.strategy, sub_grid, request.cost_bps)[:, 0, :]
+        for rank, config in enumerate(order):
+            curve = pd.DataFrame({"equity": curves[:, rank]}, index=dates)
+            curve = downsampling.downsample_frame(curve, request.max_points, ['equity'])
+            best.append(BacktestResult(
+                symbol=symbol,
+                parameters={name: float(values[config]) for name, values in grid.items()},
+                total_return=round(float(metrics["total_return"][s, config]), 4),
+                annual_return=round(float(metrics["annual_return"][s, config]), 4),
+                sharpe_ratio=round(float(metrics["sharpe_ratio"][s, config]), 4),
+                max_drawdown=round(float(metrics["max_drawdown"][s, config]), 4),
+                trades=int(metrics["trades"][s, config]),
+                equity_curve=[EquityPoint(date=date.strftime('%Y-%m-%d'), equity=round(float(value), 4))
+                              for date, value in curve['equity'].items()]
+            ))
+
+    return BacktestResponse(
+        strategy=request.strategy,
+        symbols=symbols,
+        start_date=dates[0].strftime('%Y-%m-%d'),
+        end_date=dates[-1].strftime('%Y-%m-%d'),
+        configurations=len(next(iter(grid.values()))),
+        parameters={name: values.tolist() for name, values in grid.items()},
+        grids=grids,
+        best=best
+    )
+
+@router.post("/run", response_model=BacktestResponse)
+async def run_backtest(request: BacktestRequest, http_request: Request):
+    """
+    Backtest an indicator trading rule over a parameter grid for several symbols
+    """
+    request.symbols = list(dict.fromkeys(s.upper() for s in request.symbols))
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="Select at least one symbol to backtest")
+    if request.max_points is not None and request.max_points < downsampling.MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {downsampling.MIN_POINTS}")
+    try:
+        grid = backtesting.parameter_grid(request.strategy, request.parameters)
+        backtesting.check_size(len(next(iter(grid.values()))), len(request.symbols))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await admission.run("backtest", http_request, lambda: compute_backtest(request, grid, http_request))
+
+def compute_backtest(request: BacktestRequest, grid: Dict[str, np.ndarray], http_request: Request):
+    """Download prices and serve the backtest, runs in a worker thread under the request deadline"""
+    try:
+        prices = get_prices(request.symbols, request.period)
+
+        if len(prices) < 2:
+            raise HTTPException(status_code=404, detail="No price history found for the selected symbols")
+
+        cache_key = response_cache.make_key("backtest", request.model_dump(), prices)
+        return response_cache.serve(http_request, cache_key, lambda: build_backtest(request, grid, prices))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        admission.raise_for_timeout(e)
+        raise HTTPException(status_code=500, detail=f"Error running backtest: {str(e)}")
+
+@router.get("/strategies")
+async def get_strategies():
+    """
+    List available backtest strategies and their default parameter grids
+    """
+    return {
+        "strategies": backtesting.DEFAULT_GRIDS,
+        "max_configurations": backtesting.MAX_CONFIGURATIONS,
+        "max_symbols": backtesting.MAX_SYMBOLS,
+        "max_evaluations": backtesting.MAX_EVALUATIONS,
+        "rules": {
+            "ma_crossover": "Long while the fast moving average is above the slow moving average",
+            "rsi": "Enter long when RSI falls below lower, exit when it rises above upper",
+            "macd": "Long while the MACD line is above its signal line",
+            "bollinger": "Enter long below the lower band (num_std deviations), exit above the middle band"
+        }
+    }
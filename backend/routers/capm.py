@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from models.stock_models import CAPMRequest, CAPMResponse, BetaResult, CAPMResult
+from services import admission, downsampling, response_cache
 import pandas as pd
 import yfinance as yf
 import datetime
 import capm_functions
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 
 @router.post("/calculate", response_model=CAPMResponse)
-async def calculate_capm(request: CAPMRequest):
+async def calculate_capm(request: CAPMRequest, http_request: Request):
     """
     Calculate CAPM (Capital Asset Pricing Model) for selected stocks
     """
+    # Normalize symbols so equivalent requests share a cache entry
+    request.stocks = [stock.upper() for stock in request.stocks]
+    if request.max_points is not None and request.max_points < downsampling.MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {downsampling.MIN_POINTS}")
+
+    return await admission.run("capm", http_request, lambda: compute_capm(request, http_request))
+
+def compute_capm(request: CAPMRequest, http_request: Request):
+    """Download prices and serve the CAPM result, runs in a worker thread under the request deadline"""
     try:
         # Set date range
         end = datetime.date.today()
@@ -21,15 +31,18 @@ async def calculate_capm(request: CAPMRequest):
                             datetime.date.today().day)
         
         # Download S&P 500 data
-        SP500 = yf.download("^GSPC", start=start, end=end)
+        SP500 = admission.fetch(lambda timeout: yf.download("^GSPC", start=start, end=end, timeout=timeout))
         
         # Download stock data
         stocks_df = pd.DataFrame()
         for stock in request.stocks:
             try:
-                data = yf.download(stock, start=start, end=end)
+                data = admission.fetch(lambda timeout: yf.download(stock, start=start, end=end, timeout=timeout))
                 stocks_df[f'{stock}'] = data['Close']
+            except HTTPException:
+                raise
             except Exception as e:
+                admission.raise_for_timeout(e)
                 raise HTTPException(status_code=400, detail=f"Error downloading data for {stock}: {str(e)}")
         
         stocks_df.reset_index(inplace=True)
@@ -44,53 +57,72 @@ async def calculate_capm(request: CAPMRequest):
         # Merge dataframes
         stocks_df = pd.merge(stocks_df, SP500, on='Date', how='inner')
         
-        # Convert to list of dictionaries for JSON response
-        stocks_data = stocks_df.to_dict('records')
-        
-        # Normalize data
-        normalized_df = capm_functions.normalize(stocks_df)
-        normalized_data = normalized_df.to_dict('records')
-        
-        # Calculate daily returns
-        stocks_daily_return = capm_functions.daily_return(stocks_df)
-        
-        # Calculate beta and alpha for each stock
-        beta_results = []
-        capm_results = []
-        
-        for stock in request.stocks:
-            if stock in stocks_daily_return.columns:
-                beta, alpha = capm_functions.calculate_beta(stocks_daily_return, stock)
-                
-                beta_results.append(BetaResult(
-                    stock=stock,
-                    beta=round(beta, 4),
-                    alpha=round(alpha, 4)
-                ))
-                
-                # Calculate CAPM expected return
-                rf = 0  # Risk-free rate
-                rm = stocks_daily_return['GSPC'].mean() * 252  # Market return
-                expected_return = rf + beta * (rm - rf)
-                
-                capm_results.append(CAPMResult(
-                    stock=stock,
-                    beta=round(beta, 4),
-                    expected_return=round(expected_return, 4)
-                ))
-        
-        return CAPMResponse(
-            stocks_data=stocks_data,
-            normalized_data=normalized_data,
-            beta_results=beta_results,
-            capm_results=capm_results,
-            market_return=round(stocks_daily_return['GSPC'].mean() * 252, 4),
-            risk_free_rate=0
-        )
+        cache_key = response_cache.make_key("capm", request.model_dump(), stocks_df)
+        return response_cache.serve(http_request, cache_key, lambda: build_capm(request, stocks_df))
         
+    except HTTPException:
+        raise
     except Exception as e:
+        admission.raise_for_timeout(e)
         raise HTTPException(status_code=500, detail=f"Error calculating CAPM: {str(e)}")
 
+@router.get("/calculate", response_model=CAPMResponse)
+async def calculate_capm_get(http_request: Request, stocks: List[str] = Query(...), years: int = 1,
+                             max_points: Optional[int] = None):
+    """
+    Cacheable GET variant of /calculate for conditional requests
+    """
+    return await calculate_capm(CAPMRequest(stocks=stocks, years=years, max_points=max_points), http_request)
+
+def build_capm(request: CAPMRequest, stocks_df: pd.DataFrame) -> CAPMResponse:
+    """Compute normalized prices, beta and CAPM expected return from merged closes"""
+    # Normalize data
+    normalized_df = capm_functions.normalize(stocks_df)
+    
+    # Downsample chart rows on the normalized series so every stock gets a comparable share
+    chart_df = downsampling.downsample_frame(normalized_df, request.max_points, normalized_df.columns[1:])
+    
+    # Convert to list of dictionaries for JSON response
+    stocks_data = stocks_df.loc[chart_df.index].to_dict('records')
+    normalized_data = chart_df.to_dict('records')
+    
+    # Calculate daily returns
+    stocks_daily_return = capm_functions.daily_return(stocks_df)
+    
+    # Calculate beta and alpha for each stock
+    beta_results = []
+    capm_results = []
+    
+    for stock in request.stocks:
+        if stock in stocks_daily_return.columns:
+            beta, alpha = capm_functions.calculate_beta(stocks_daily_return, stock)
+            
+            beta_results.append(BetaResult(
+                stock=stock,
+                beta=round(beta, 4),
+                alpha=round(alpha, 4)
+            ))
+            
+            # Calculate CAPM expected return
+            rf = 0  # Risk-free rate
+            rm = stocks_daily_return['GSPC'].mean() * 252  # Market return
+            expected_return = rf + beta * (rm - rf)
+            
+            capm_results.append(CAPMResult(
+                stock=stock,
+                beta=round(beta, 4),
+                expected_return=round(expected_return, 4)
+            ))
+    
+    return CAPMResponse(
+        stocks_data=stocks_data,
+        normalized_data=normalized_data,
+        beta_results=beta_results,
+        capm_results=capm_results,
+        market_return=round(stocks_daily_return['GSPC'].mean() * 252, 4),
+        risk_free_rate=0
+    )
+
 @router.get("/available-stocks")
 async def get_available_stocks():
     """
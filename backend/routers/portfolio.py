@@ -0,0 +1,87 @@
+from fastapi import APIRouter, HTTPException, Request
+from models.stock_models import PortfolioRequest, PortfolioResponse, PortfolioWeights
+from services import admission, response_cache
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import datetime
+import portfolio_functions
+from typing import List
+
+router = APIRouter()
+
+def get_prices(stocks: List[str], years: int) -> pd.DataFrame:
+    """Download aligned close prices for all stocks in a single request"""
+    stocks = list(dict.fromkeys(stocks))
+    end = datetime.date.today()
+    start = datetime.date(end.year - years, end.month, end.day)
+    data = admission.fetch(lambda timeout: yf.download(stocks, start=start, end=end, timeout=timeout))['Close']
+    if isinstance(data, pd.Series):
+        data = data.to_frame(name=stocks[0])
+    return data[stocks].dropna(how='all').ffill().dropna()
+
+def to_weights(weights: np.ndarray, stocks: List[str], mean: np.ndarray, cov: np.ndarray,
+               risk_free_rate: float) -> PortfolioWeights:
+    expected, volatility, sharpe = portfolio_functions.portfolio_stats(weights, mean, cov, risk_free_rate)
+    return PortfolioWeights(
+        expected_return=round(expected, 4),
+        volatility=round(volatility, 4),
+        sharpe_ratio=round(sharpe, 4),
+        weights={stock: round(float(w), 4) for stock, w in zip(stocks, weights)}
+    )
+
+def build_portfolio(request: PortfolioRequest, prices: pd.DataFrame) -> PortfolioResponse:
+    """Compute shrunk covariance, correlation and the efficient frontier from aligned closes"""
+    stocks = list(prices.columns)
+    returns = portfolio_functions.returns_matrix(prices)
+    mean, cov, shrinkage = portfolio_functions.shrunk_covariance(returns)
+    rf = request.risk_free_rate
+
+    min_variance, tangency = portfolio_functions.special_portfolios(mean, cov, rf)
+    min_return = float(min_variance @ mean)
+    targets = np.linspace(min_return, max(mean.max(), min_return), request.frontier_points)
+    frontier_weights, _ = portfolio_functions.efficient_frontier(mean, cov, targets)
+
+    return PortfolioResponse(
+        stocks=stocks,
+        observations=len(returns),
+        expected_returns={s: round(float(m), 4) for s, m in zip(stocks, mean)},
+        volatilities={s: round(float(v), 4) for s, v in zip(stocks, np.sqrt(np.diag(cov)))},
+        covariance=np.round(cov, 6).tolist(),
+        correlation=np.round(portfolio_functions.correlation(cov), 4).tolist(),
+        shrinkage=round(shrinkage, 4),
+        min_variance=to_weights(min_variance, stocks, mean, cov, rf),
+        max_sharpe=to_weights(tangency, stocks, mean, cov, rf) if tangency is not None else None,
+        efficient_frontier=[to_weights(w, stocks, mean, cov, rf) for w in frontier_weights],
+        risk_free_rate=rf
+    )
+
+@router.post("/analyze", response_model=PortfolioResponse)
+async def analyze_portfolio(request: PortfolioRequest, http_request: Request):
+    """
+    Portfolio risk analysis: shrinkage covariance, correlation and efficient frontier
+    """
+    request.stocks = list(dict.fromkeys(stock.upper() for stock in request.stocks))
+    if len(request.stocks) < 2:
+        raise HTTPException(status_code=400, detail="Select at least two stocks for portfolio analysis")
+    if not 2 <= request.frontier_points <= 500:
+        raise HTTPException(status_code=400, detail="frontier_points must be between 2 and 500")
+
+    return await admission.run("portfolio", http_request, lambda: compute_portfolio(request, http_request))
+
+def compute_portfolio(request: PortfolioRequest, http_request: Request):
+    """Download prices and serve the portfolio analysis, runs in a worker thread under the request deadline"""
+    try:
+        prices = get_prices(request.stocks, request.years)
+
+        if len(prices) < 2:
+            raise HTTPException(status_code=404, detail="Not enough overlapping price history for the selected stocks")
+
+        cache_key = response_cache.make_key("portfolio", request.model_dump(), prices)
+        return response_cache.serve(http_request, cache_key, lambda: build_portfolio(request, prices))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        admission.raise_for_timeout(e)
+        raise HTTPException(status_code=500, detail=f"Error analyzing portfolio: {str(e)}")
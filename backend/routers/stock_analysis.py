@@ -1,134 +1,181 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from models.stock_models import StockAnalysisRequest, StockAnalysisResponse, StockData
+from services import admission, downsampling, intraday_store, response_cache
 import yfinance as yf
 import pandas as pd
 import numpy as np
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
 @router.post("/analyze", response_model=StockAnalysisResponse)
-async def analyze_stock(request: StockAnalysisRequest):
+async def analyze_stock(request: StockAnalysisRequest, http_request: Request):
     """
     Perform comprehensive stock analysis including price data and technical indicators
     """
+    # Normalize the symbol so equivalent requests share a cache entry
+    request.symbol = request.symbol.upper()
+    if request.max_points is not None and request.max_points < downsampling.MIN_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {downsampling.MIN_POINTS}")
+
+    intraday = request.interval != "1d"
+    if intraday and request.interval not in intraday_store.INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(intraday_store.INTERVALS)}")
+    if intraday and request.period not in intraday_store.INTRADAY_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Intraday analysis supports period {', '.join(intraday_store.INTRADAY_PERIODS)}")
+
+    return await admission.run("analysis", http_request, lambda: compute_analysis(request, http_request))
+
+def compute_analysis(request: StockAnalysisRequest, http_request: Request):
+    """Fetch history and serve the analysis, runs in a worker thread under the request deadline"""
     try:
-        # Get stock data
+        # Get stock data, intraday bars come from the encoded store
         ticker = yf.Ticker(request.symbol)
-        hist_data = ticker.history(period=request.period)
-        stock_info = ticker.info
+        if request.interval != "1d":
+            hist_data = intraday_store.store.history(request.symbol.upper(), request.period, request.interval)
+        else:
+            hist_data = admission.fetch(lambda timeout: ticker.history(period=request.period, timeout=timeout))
         
         if hist_data.empty:
             raise HTTPException(status_code=404, detail=f"No data found for symbol {request.symbol}")
         
-        # Convert price data to list of StockData objects
-        price_data = []
-        for date, row in hist_data.iterrows():
-            price_data.append(StockData(
-                date=date.strftime('%Y-%m-%d'),
-                price=round(row['Close'], 2)
-            ))
-        
-        # Calculate technical indicators
-        close_prices = hist_data['Close']
-        
-        # Moving averages
-        ma_10 = close_prices.rolling(window=10).mean()
-        ma_20 = close_prices.rolling(window=20).mean()
-        ma_50 = close_prices.rolling(window=50).mean()
-        
-        # RSI calculation
-        def calculate_rsi(prices, window=14):
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
-        
-        rsi = calculate_rsi(close_prices)
-        
-        # MACD calculation
-        exp1 = close_prices.ewm(span=12).mean()
-        exp2 = close_prices.ewm(span=26).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9).mean()
-        
-        # Bollinger Bands
-        bb_period = 20
-        bb_std = 2
-        bb_middle = close_prices.rolling(window=bb_period).mean()
-        bb_std_dev = close_prices.rolling(window=bb_period).std()
-        bb_upper = bb_middle + (bb_std_dev * bb_std)
-        bb_lower = bb_middle - (bb_std_dev * bb_std)
-        
-        # Volume analysis
-        avg_volume = hist_data['Volume'].mean()
-        current_volume = hist_data['Volume'].iloc[-1]
-        
-        technical_indicators = {
-            "moving_averages": {
-                "ma_10": round(ma_10.iloc[-1], 2) if not pd.isna(ma_10.iloc[-1]) else None,
-                "ma_20": round(ma_20.iloc[-1], 2) if not pd.isna(ma_20.iloc[-1]) else None,
-                "ma_50": round(ma_50.iloc[-1], 2) if not pd.isna(ma_50.iloc[-1]) else None,
-            },
-            "rsi": round(rsi.iloc[-1], 2) if not pd.isna(rsi.iloc[-1]) else None,
-            "macd": {
-                "macd": round(macd.iloc[-1], 4) if not pd.isna(macd.iloc[-1]) else None,
-                "signal": round(signal.iloc[-1], 4) if not pd.isna(signal.iloc[-1]) else None,
-                "histogram": round((macd - signal).iloc[-1], 4) if not pd.isna((macd - signal).iloc[-1]) else None,
-            },
-            "bollinger_bands": {
-                "upper": round(bb_upper.iloc[-1], 2) if not pd.isna(bb_upper.iloc[-1]) else None,
-                "middle": round(bb_middle.iloc[-1], 2) if not pd.isna(bb_middle.iloc[-1]) else None,
-                "lower": round(bb_lower.iloc[-1], 2) if not pd.isna(bb_lower.iloc[-1]) else None,
-            },
-            "volume": {
-                "current": int(current_volume),
-                "average": int(avg_volume),
-                "relative": round(current_volume / avg_volume, 2) if avg_volume > 0 else None,
-            }
-        }
-        
-        # Calculate summary statistics
-        current_price = close_prices.iloc[-1]
-        previous_close = close_prices.iloc[-2] if len(close_prices) > 1 else current_price
-        price_change = current_price - previous_close
-        percent_change = (price_change / previous_close) * 100 if previous_close != 0 else 0
-        
-        high_52w = close_prices.max()
-        low_52w = close_prices.min()
-        avg_price = close_prices.mean()
-        volatility = close_prices.std() / avg_price if avg_price > 0 else 0
-        
-        summary = {
-            "current_price": round(current_price, 2),
-            "price_change": round(price_change, 2),
-            "percent_change": round(percent_change, 2),
-            "high_52w": round(high_52w, 2),
-            "low_52w": round(low_52w, 2),
-            "average_price": round(avg_price, 2),
-            "volatility": round(volatility, 4),
-            "trend": "uptrend" if current_price > close_prices.iloc[0] else "downtrend",
-            "market_cap": stock_info.get('marketCap'),
-            "pe_ratio": stock_info.get('trailingPE'),
-            "beta": stock_info.get('beta'),
-            "eps": stock_info.get('trailingEps'),
-        }
-        
-        return StockAnalysisResponse(
-            symbol=request.symbol.upper(),
-            current_price=round(current_price, 2),
-            price_data=price_data,
-            technical_indicators=technical_indicators,
-            summary=summary
-        )
+        cache_key = response_cache.make_key("analysis", request.model_dump(), hist_data)
+        return response_cache.serve(http_request, cache_key, lambda: build_analysis(request, ticker, hist_data))
         
+    except HTTPException:
+        raise
     except Exception as e:
+        admission.raise_for_timeout(e)
         raise HTTPException(status_code=500, detail=f"Error analyzing stock {request.symbol}: {str(e)}")
 
+@router.get("/analyze", response_model=StockAnalysisResponse)
+async def analyze_stock_get(http_request: Request, symbol: str, period: str = "1y",
+                            max_points: Optional[int] = None, interval: str = "1d"):
+    """
+    Cacheable GET variant of /analyze for conditional requests
+    """
+    return await analyze_stock(StockAnalysisRequest(symbol=symbol, period=period, max_points=max_points,
+                                                    interval=interval), http_request)
+
+def build_analysis(request: StockAnalysisRequest, ticker: yf.Ticker, hist_data: pd.DataFrame) -> StockAnalysisResponse:
+    """Compute price data, technical indicators and summary from downloaded history"""
+    admission.check_deadline()
+    stock_info = ticker.info
+    
+    # Convert price data to list of StockData objects, downsampled for charting
+    chart_data = downsampling.downsample_frame(hist_data, request.max_points, ['Close'])
+    date_format = '%Y-%m-%d' if request.interval == "1d" else '%Y-%m-%d %H:%M'
+    price_data = []
+    for date, row in chart_data.iterrows():
+        price_data.append(StockData(
+            date=date.strftime(date_format),
+            price=round(row['Close'], 2)
+        ))
+    
+    # Calculate technical indicators
+    close_prices = hist_data['Close']
+    
+    # Moving averages
+    ma_10 = close_prices.rolling(window=10).mean()
+    ma_20 = close_prices.rolling(window=20).mean()
+    ma_50 = close_prices.rolling(window=50).mean()
+    
+    # RSI calculation
+    def calculate_rsi(prices, window=14):
+        delta = prices.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+        rs = gain / loss
+        rsi = 100 - (100 / (1 + rs))
+        return rsi
+    
+    rsi = calculate_rsi(close_prices)
+    
+    # MACD calculation
+    exp1 = close_prices.ewm(span=12).mean()
+    exp2 = close_prices.ewm(span=26).mean()
+    macd = exp1 - exp2
+    signal = macd.ewm(span=9).mean()
+    
+    # Bollinger Bands
+    bb_period = 20
+    bb_std = 2
+    bb_middle = close_prices.rolling(window=bb_period).mean()
+    bb_std_dev = close_prices.rolling(window=bb_period).std()
+    bb_upper = bb_middle + (bb_std_dev * bb_std)
+    bb_lower = bb_middle - (bb_std_dev * bb_std)
+    
+    # Volume analysis
+    avg_volume = hist_data['Volume'].mean()
+    current_volume = hist_data['Volume'].iloc[-1]
+    
+    technical_indicators = {
+        "moving_averages": {
+            "ma_10": round(ma_10.iloc[-1], 2) if not pd.isna(ma_10.iloc[-1]) else None,
+            "ma_20": round(ma_20.iloc[-1], 2) if not pd.isna(ma_20.iloc[-1]) else None,
+            "ma_50": round(ma_50.iloc[-1], 2) if not pd.isna(ma_50.iloc[-1]) else None,
+        },
+        "rsi": round(rsi.iloc[-1], 2) if not pd.isna(rsi.iloc[-1]) else None,
+        "macd": {
+            "macd": round(macd.iloc[-1], 4) if not pd.isna(macd.iloc[-1]) else None,
+            "signal": round(signal.iloc[-1], 4) if not pd.isna(signal.iloc[-1]) else None,
+            "histogram": round((macd - signal).iloc[-1], 4) if not pd.isna((macd - signal).iloc[-1]) else None,
+        },
+        "bollinger_bands": {
+            "upper": round(bb_upper.iloc[-1], 2) if not pd.isna(bb_upper.iloc[-1]) else None,
+            "middle": round(bb_middle.iloc[-1], 2) if not pd.isna(bb_middle.iloc[-1]) else None,
+            "lower": round(bb_lower.iloc[-1], 2) if not pd.isna(bb_lower.iloc[-1]) else None,
+        },
+        "volume": {
+            "current": int(current_volume),
+            "average": int(avg_volume),
+            "relative": round(current_volume / avg_volume, 2) if avg_volume > 0 else None,
+        }
+    }
+    
+    # Calculate summary statistics
+    current_price = close_prices.iloc[-1]
+    previous_close = close_prices.iloc[-2] if len(close_prices) > 1 else current_price
+    price_change = current_price - previous_close
+    percent_change = (price_change / previous_close) * 100 if previous_close != 0 else 0
+    
+    high_52w = close_prices.max()
+    low_52w = close_prices.min()
+    avg_price = close_prices.mean()
+    volatility = close_prices.std() / avg_price if avg_price > 0 else 0
+    
+    summary = {
+        "current_price": round(current_price, 2),
+        "price_change": round(price_change, 2),
+        "percent_change": round(percent_change, 2),
+        "high_52w": round(high_52w, 2),
+        "low_52w": round(low_52w, 2),
+        "average_price": round(avg_price, 2),
+        "volatility": round(volatility, 4),
+        "trend": "uptrend" if current_price > close_prices.iloc[0] else "downtrend",
+        "market_cap": stock_info.get('marketCap'),
+        "pe_ratio": stock_info.get('trailingPE'),
+        "beta": stock_info.get('beta'),
+        "eps": stock_info.get('trailingEps'),
+    }
+    
+    return StockAnalysisResponse(
+        symbol=request.symbol.upper(),
+        current_price=round(current_price, 2),
+        price_data=price_data,
+        technical_indicators=technical_indicators,
+        summary=summary
+    )
+
+@router.get("/intraday/stats")
+async def get_intraday_stats():
+    """
+    Memory used by the encoded intraday bar store in this worker
+    """
+    return {"symbols": intraday_store.store.stats()}
+
 @router.get("/search/{query}")
 async def search_stocks(query: str):
     """
@@ -0,0 +1,250 @@
+"""
+Admission control for heavy endpoints.
+
+Each endpoint has a limiter with a fixed number of concurrent slots and a
+bounded wait queue. Requests that find the queue full, or that cannot get a
+slot before their deadline, are shed immediately with 503 and Retry-After
+instead of slowing every in-flight request down.
+
+Admitted work runs in a worker thread under a deadline. Yahoo Finance
+fetches go through fetch(), which gives them the remaining time as their
+timeout, and long computations call check_deadline() between steps so
+abandoned work stops early. A request whose deadline passes, or whose
+upstream fetch times out, gets 504.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import requests
+from fastapi import HTTPException, Request
+
+DEFAULT_FETCH_TIMEOUT = 10
+TIMEOUT_HEADER = "x-request-timeout"
+
+# name: (max concurrent, max queued, deadline in seconds)
+DEFAULT_LIMITS = {
+    "analysis": (8, 32, 20),
+    "capm": (4, 16, 25),
+    "prediction": (2, 8, 25),
+    "portfolio": (2, 8, 25),
+    "backtest": (2, 4, 60),
+}
+
+
+class Overloaded(HTTPException):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, detail: str = "Request deadline exceeded"):
+        super().__init__(status_code=504, detail=detail)
+
+
+class UpstreamTimeout(DeadlineExceeded):
+    def __init__(self):
+        super().__init__("Market data request timed out")
+
+
+# Timeouts raised by the HTTP clients yfinance may use
+TIMEOUT_ERRORS: tuple = (TimeoutError, requests.exceptions.Timeout)
+try:
+    from curl_cffi.requests.exceptions import Timeout as _CurlTimeout
+    TIMEOUT_ERRORS += (_CurlTimeout,)
+except ImportError:
+    pass
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """Absolute deadline shared between a request and the thread doing its work"""
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.cancelled or time.monotonic() >= self.expires
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside admission control"""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceeded if the current request has run out of time or was abandoned"""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded()
+
+
+def fetch_timeout(default: float = DEFAULT_FETCH_TIMEOUT) -> float:
+    """Timeout for an upstream fetch: the remaining deadline, capped at default"""
+    check_deadline()
+    left = remaining()
+    return default if left is None else max(min(default, left), 0.1)
+
+
+def fetch(download: Callable[[float], T], default: float = DEFAULT_FETCH_TIMEOUT) -> T:
+    """
+    Call download(timeout) with fetch_timeout() and report upstream timeouts as
+    504. yfinance hides most network errors and returns an empty frame instead,
+    so an empty result that used up the whole timeout also counts as one.
+    """
+    timeout = fetch_timeout(default)
+    started = time.monotonic()
+    try:
+        result = download(timeout)
+    except TIMEOUT_ERRORS:
+        raise UpstreamTimeout()
+    if getattr(result, "empty", False) and time.monotonic() - started >= timeout:
+        raise UpstreamTimeout()
+    return result
+
+
+def raise_for_timeout(error: Exception) -> None:
+    """In a broad except block: raise 504 if error is a timeout or the request ran out of time"""
+    check_deadline()
+    if isinstance(error, TIMEOUT_ERRORS):
+        raise UpstreamTimeout()
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded wait queue for one endpoint"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.deadline_exceeded = 0
+        self.completed = 0
+        self.avg_service_seconds = 1.0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from the average service time"""
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self.avg_service_seconds))
+
+    async def acquire(self, deadline: Deadline) -> None:
+        if not self._semaphore.locked():
+            # A slot is free, so this returns without suspending
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} is at capacity, try again later", self.retry_after())
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline.remaining())
+            except asyncio.TimeoutError:
+                self.queue_timeouts += 1
+                raise Overloaded(f"{self.name} queue wait exceeded the request deadline", self.retry_after())
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self, service_seconds: float) -> None:
+        self.active -= 1
+        self.completed += 1
+        self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * service_seconds
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "timeout_seconds": self.timeout,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            "deadline_exceeded": self.deadline_exceeded,
+            "avg_service_seconds": round(self.avg_service_seconds, 3),
+        }
+
+
+def _limits(name: str, default):
+    """Override defaults with STOCKLYZER_LIMIT_<NAME>=concurrent,queue,timeout"""
+    value = os.getenv(f"STOCKLYZER_LIMIT_{name.upper()}")
+    if not value:
+        return default
+    concurrent, queue, timeout = value.split(",")
+    return int(concurrent), int(queue), float(timeout)
+
+
+limiters: Dict[str, AdmissionLimiter] = {
+    name: AdmissionLimiter(name, *_limits(name, default)) for name, default in DEFAULT_LIMITS.items()
+}
+
+
+def request_timeout(request: Request, limit: float) -> float:
+    """Deadline requested by the client via X-Request-Timeout, never above the endpoint limit"""
+    try:
+        asked = float(request.headers.get(TIMEOUT_HEADER, limit))
+    except ValueError:
+        asked = limit
+    if not math.isfinite(asked):
+        asked = limit
+    return min(max(asked, 0.0), limit)
+
+
+async def run(name: str, request: Request, work: Callable[[], Any]) -> Any:
+    """
+    Admit a request to the named endpoint and run blocking work in a thread
+    under its deadline. The slot stays taken until the thread finishes, so
+    abandoned work still counts against the limit until it notices.
+    """
+    limiter = limiters[name]
+    deadline = Deadline(request_timeout(request, limiter.timeout))
+    await limiter.acquire(deadline)
+    started = time.monotonic()
+
+    def finished(future: asyncio.Future) -> None:
+        limiter.release(time.monotonic() - started)
+        if not future.cancelled():
+            future.exception()  # mark retrieved; the error was already reported or is moot
+
+    token = _current.set(deadline)
+    try:
+        future = asyncio.ensure_future(asyncio.to_thread(work))
+    finally:
+        _current.reset(token)
+    future.add_done_callback(finished)
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        deadline.cancelled = True
+        limiter.deadline_exceeded += 1
+        raise DeadlineExceeded()
+    except asyncio.CancelledError:
+        # Client went away; let the worker stop at its next checkpoint
+        deadline.cancelled = True
+        raise
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
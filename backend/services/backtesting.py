@@ -0,0 +1,258 @@
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import admission
+
+TRADING_DAYS = 252
+MAX_CONFIGURATIONS = 50000
+MAX_SYMBOLS = 20
+# Upper bound on configurations x symbols, which sets the size of the per-configuration metrics
+MAX_EVALUATIONS = 200000
+# Upper bound on elements of one (bars x symbols x configurations) block
+CHUNK_ELEMENTS = 4_000_000
+
+DEFAULT_GRIDS = {
+    "ma_crossover": {"fast": list(range(5, 55, 5)), "slow": list(range(20, 210, 10))},
+    "rsi": {"window": [7, 14, 21, 28], "lower": [20, 25, 30, 35], "upper": [65, 70, 75, 80]},
+    "macd": {"fast": [8, 12, 16], "slow": [21, 26, 34], "signal": [5, 9, 13]},
+    "bollinger": {"window": [10, 20, 30, 50], "num_std": [1.5, 2.0, 2.5, 3.0]},
+}
+STRATEGIES = tuple(DEFAULT_GRIDS)
+# Parameters that are window lengths, with the smallest allowed value
+WINDOW_PARAMETERS = {
+    "ma_crossover": {"fast": 1, "slow": 1},
+    "rsi": {"window": 1},
+    "macd": {"fast": 1, "slow": 1, "signal": 1},
+    "bollinger": {"window": 2},
+}
+
+PositionBuilder = Callable[[slice], np.ndarray]
+
+
+def parameter_grid(strategy: str, overrides: Optional[Dict[str, List[float]]] = None) -> Dict[str, np.ndarray]:
+    """Cartesian product of the strategy's parameter lists, one flat array per parameter"""
+    if strategy not in DEFAULT_GRIDS:
+        raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+    spec = dict(DEFAULT_GRIDS[strategy])
+    for name, values in (overrides or {}).items():
+        if name not in spec:
+            raise ValueError(f"Unknown parameter '{name}' for {strategy}; expected {', '.join(spec)}")
+        if not values:
+            raise ValueError(f"Parameter '{name}' needs at least one value")
+        spec[name] = values
+
+    names = list(spec)
+    combos = np.array(list(itertools.product(*(sorted(set(spec[n])) for n in names))), dtype=np.float64)
+    grid = {name: combos[:, i] for i, name in enumerate(names)}
+
+    # Drop configurations that do not make sense for the rule
+    valid = np.ones(len(combos), dtype=bool)
+    for name, minimum in WINDOW_PARAMETERS[strategy].items():
+        grid[name] = np.round(grid[name])
+        valid &= grid[name] >= minimum
+    if "fast" in grid:
+        valid &= grid["fast"] < grid["slow"]
+    if strategy == "rsi":
+        valid &= grid["lower"] < grid["upper"]
+    if strategy == "bollinger":
+        valid &= grid["num_std"] > 0
+    grid = {name: values[valid] for name, values in grid.items()}
+
+    count = int(valid.sum())
+    if count == 0:
+        raise ValueError("Parameter grid has no valid configurations")
+    if count > MAX_CONFIGURATIONS:
+        raise ValueError(f"Parameter grid has {count} configurations; the limit is {MAX_CONFIGURATIONS}")
+    return grid
+
+
+def check_size(configs: int, symbols: int) -> None:
+    """Reject runs whose metrics would not fit the evaluation limits"""
+    if symbols > MAX_SYMBOLS:
+        raise ValueError(f"Backtests are limited to {MAX_SYMBOLS} symbols")
+    if configs * symbols > MAX_EVALUATIONS:
+        raise ValueError(f"{configs} configurations x {symbols} symbols exceeds the limit of "
+                         f"{MAX_EVALUATIONS} evaluations; narrow the parameter grid or use fewer symbols")
+
+
+def cumulative(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Running sums and counts of the finite (bars x symbols) values, with a leading zero row"""
+    finite = np.isfinite(values)
+    zeros = np.zeros((1,) + values.shape[1:])
+    csum = np.concatenate([zeros, np.cumsum(np.where(finite, values, 0.0), axis=0)])
+    ccount = np.concatenate([zeros, np.cumsum(finite, axis=0)])
+    return csum, ccount
+
+
+def rolling_means(sums: Tuple[np.ndarray, np.ndarray], windows: np.ndarray) -> np.ndarray:
+    """
+    Trailing means for every window at once from cumulative() sums, shape
+    (bars, symbols, windows). Windows containing missing values are NaN.
+    """
+    csum, ccount = sums
+    bars = len(csum) - 1
+    windows = windows.astype(np.int64)
+    ends = np.arange(1, bars + 1)
+    starts = np.clip(ends[:, None] - windows[None, :], 0, None)
+    totals = (csum[ends][:, None, :] - csum[starts]).transpose(0, 2, 1)
+    counts = (ccount[ends][:, None, :] - ccount[starts]).transpose(0, 2, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts == windows, totals / windows, np.nan)
+
+
+def ewm_means(values: np.ndarray, spans: np.ndarray) -> np.ndarray:
+    """Exponentially weighted means of (bars x columns) values, one span per column"""
+    result = np.empty_like(values)
+    for span in np.unique(spans):
+        columns = np.flatnonzero(spans == span)
+        result[:, columns] = pd.DataFrame(values[:, columns]).ewm(span=span).mean().to_numpy()
+    return result
+
+
+def hold(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """Long from an entry bar until the next exit bar, forward-filled along the bar axis"""
+    state = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    bars = np.arange(len(state)).reshape((-1,) + (1,) * (state.ndim - 1))
+    last = np.where(np.isnan(state), 0, bars)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.nan_to_num(np.take_along_axis(state, last, axis=0))
+
+
+# Each builder precomputes (bars x symbols) inputs once and returns a function
+# that derives indicators for one block of configurations only, so memory
+# scales with the block size rather than with the grid.
+
+def _ma_crossover(close: np.ndarray, grid: Dict[str, np.ndarray]) -> PositionBuilder:
+    sums = cumulative(close)
+
+    def build(configs: slice) -> np.ndarray:
+        fast, slow = grid["fast"][configs], grid["slow"][configs]
+        windows, index = np.unique(np.concatenate([fast, slow]), return_inverse=True)
+        ma = rolling_means(sums, windows)
+        return (ma[:, :, index[:len(fast)]] > ma[:, :, index[len(fast):]]).astype(np.float64)
+    return build
+
+
+def _rsi(close: np.ndarray, grid: Dict[str, np.ndarray]) -> PositionBuilder:
+    delta = np.diff(close, axis=0, prepend=close[:1])
+    gains = cumulative(np.clip(delta, 0, None))
+    losses = cumulative(np.clip(-delta, 0, None))
+
+    def build(configs: slice) -> np.ndarray:
+        windows, index = np.unique(grid["window"][configs], return_inverse=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsi = 100 - 100 / (1 + rolling_means(gains, windows) / rolling_means(losses, windows))
+        values = rsi[:, :, index]
+        return hold(values < grid["lower"][configs], values > grid["upper"][configs])
+    return build
+
+
+def _macd(close: np.ndarray, grid: Dict[str, np.ndarray]) -> PositionBuilder:
+    bars, symbols = close.shape
+
+    def build(configs: slice) -> np.ndarray:
+        fast, slow, signal = grid["fast"][configs], grid["slow"][configs], grid["signal"][configs]
+        spans, index = np.unique(np.concatenate([fast, slow]), return_inverse=True)
+        ema = ewm_means(np.repeat(close, len(spans), axis=1), np.tile(spans, symbols)).reshape(bars, symbols, -1)
+        line = ema[:, :, index[:len(fast)]] - ema[:, :, index[len(fast):]]
+        trigger = ewm_means(line.reshape(bars, -1), np.tile(signal, symbols)).reshape(line.shape)
+        return (line > trigger).astype(np.float64)
+    return build
+
+
+def _bollinger(close: np.ndarray, grid: Dict[str, np.ndarray]) -> PositionBuilder:
+    # Center each symbol before accumulating squares to limit cancellation error
+    offset = np.nanmean(close, axis=0)
+    centered = close - offset
+    sums = cumulative(centered)
+    squares = cumulative(centered ** 2)
+    price = close[:, :, None]
+
+    def build(configs: slice) -> np.ndarray:
+        windows, index = np.unique(grid["window"][configs], return_inverse=True)
+        mean = rolling_means(sums, windows)
+        std = np.sqrt(np.clip(rolling_means(squares, windows) - mean ** 2, 0, None) * windows / (windows - 1))
+        middle = mean[:, :, index] + offset[None, :, None]
+        lower = middle - grid["num_std"][configs] * std[:, :, index]
+        return hold(price < lower, price > middle)
+    return build
+
+
+POSITION_BUILDERS = {
+    "ma_crossover": _ma_crossover,
+    "rsi": _rsi,
+    "macd": _macd,
+    "bollinger": _bollinger,
+}
+
+
+def daily_returns(close: np.ndarray) -> np.ndarray:
+    """Close-to-close returns with missing bars treated as flat"""
+    returns = np.zeros_like(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def strategy_returns(positions: np.ndarray, returns: np.ndarray, cost_bps: float = 0.0) -> np.ndarray:
+    """
+    Per-bar strategy returns for (bars, symbols, configs) positions. A position
+    decided at a bar's close earns the next bar's return; every change in
+    position pays cost_bps.
+    """
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    return held * returns[:, :, None] - turnover * (cost_bps / 10000.0)
+
+
+def performance(strategy_rets: np.ndarray) -> Dict[str, np.ndarray]:
+    """Total and annual return, Sharpe ratio and max drawdown per (symbol, config)"""
+    equity = np.cumprod(1 + strategy_rets, axis=0)
+    periods = max(len(strategy_rets) - 1, 1)
+    body = strategy_rets[1:] if len(strategy_rets) > 1 else strategy_rets
+    mean, std = body.mean(axis=0), body.std(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), 0.0)
+    drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+    return {
+        "total_return": equity[-1] - 1,
+        "annual_return": np.clip(equity[-1], 0, None) ** (TRADING_DAYS / periods) - 1,
+        "sharpe_ratio": sharpe,
+        "max_drawdown": drawdown,
+    }
+
+
+def backtest(close: np.ndarray, strategy: str, grid: Dict[str, np.ndarray],
+             cost_bps: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every configuration of grid on every symbol of close (bars x symbols).
+    Configurations are processed in blocks sized by CHUNK_ELEMENTS; each metric
+    is returned as an array of shape (symbols, configs).
+    """
+    bars, symbols = close.shape
+    configs = len(next(iter(grid.values())))
+    build = POSITION_BUILDERS[strategy](close, grid)
+    returns = daily_returns(close)
+
+    metrics = {name: np.empty((symbols, configs)) for name in
+               ("total_return", "annual_return", "sharpe_ratio", "max_drawdown", "trades")}
+    step = max(1, CHUNK_ELEMENTS // (bars * symbols))
+    for start in range(0, configs, step):
+        admission.check_deadline()
+        block = slice(start, min(start + step, configs))
+        positions = build(block)
+        for name, values in performance(strategy_returns(positions, returns, cost_bps)).items():
+            metrics[name][:, block] = values
+        metrics["trades"][:, block] = (np.diff(positions, axis=0, prepend=0.0) > 0).sum(axis=0)
+    return metrics
+
+
+def equity_curves(close: np.ndarray, strategy: str, grid: Dict[str, np.ndarray],
+                  cost_bps: float = 0.0) -> np.ndarray:
+    """Equity curves (bars, symbols, configs) for a small grid, starting at 1.0"""
+    positions = POSITION_BUILDERS[strategy](close, grid)(slice(None))
+    return np.cumprod(1 + strategy_returns(positions, daily_returns(close), cost_bps), axis=0)
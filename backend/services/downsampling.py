@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+MIN_POINTS = 3
+
+
+def lttb_indices(y: np.ndarray, max_points: int, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the sorted indices of at most max_points samples of y. The first
+    and last samples are always kept; from every bucket in between the sample
+    forming the largest triangle with the previously kept sample and the mean
+    of the next bucket is chosen, which preserves visual peaks and troughs.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points >= n or max_points < MIN_POINTS:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # Bucket boundaries for the n - 2 interior samples
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of every bucket at once; the last bucket's "next" is the final sample
+    sizes = ends - starts
+    x_sum = np.add.reduceat(x[:n - 1], starts)
+    y_sum = np.add.reduceat(y[:n - 1], starts)
+    x_next = np.append(x_sum[1:] / sizes[1:], x[-1])
+    y_next = np.append(y_sum[1:] / sizes[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[prev] - x_next[i]) * (by - y[prev]) - (x[prev] - bx) * (y_next[i] - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def downsample_frame(df: pd.DataFrame, max_points: Optional[int], columns=None) -> pd.DataFrame:
+    """
+    Downsample rows of a frame sharing one x axis. The point budget is split
+    across columns and the union of each column's LTTB selection is kept, so
+    the result stays within max_points rows (at least three per column).
+    """
+    if not max_points or len(df) <= max_points:
+        return df
+    columns = list(columns if columns is not None else df.select_dtypes('number').columns)
+    budget = max(max_points // max(len(columns), 1), MIN_POINTS)
+    keep = np.unique(np.concatenate([lttb_indices(df[c].to_numpy(), budget) for c in columns]))
+    return df.iloc[keep]
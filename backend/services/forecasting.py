@@ -0,0 +1,256 @@
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.metrics import mean_squared_error
+from sklearn.preprocessing import StandardScaler
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import adfuller
+
+from services import admission
+
+MODES = ("auto", "fast", "full")
+DEFAULT_LATENCY_BUDGET_MS = 5000
+# ARIMA autoregressive and moving average orders; the differencing order d is chosen by the ADF test
+ARIMA_P, ARIMA_Q = 5, 1
+AR_LAGS = 5
+HOLDOUT = 30
+
+# Smoothing parameter grid searched in one vectorized pass by holt_forecast
+_HOLT_ALPHA, _HOLT_BETA = (g.ravel() for g in np.meshgrid(
+    np.linspace(0.1, 1.0, 10), np.array([0.01, 0.05, 0.1, 0.2, 0.3, 0.5])))
+
+# Running estimate of ARIMA cost per observation, learned from completed fits in this process.
+# It halves every ESTIMATE_HALF_LIFE_SECONDS without a fit, so one slow fit under load
+# cannot keep "auto" on the fast models forever: ARIMA runs again and is re-measured.
+ESTIMATE_HALF_LIFE_SECONDS = 300
+_arima_ms_per_point = 1.0
+_arima_measured_at = time.monotonic()
+
+
+class ForecastInputError(ValueError):
+    """The request cannot be forecast as asked, e.g. too little history or an unknown mode"""
+
+
+def get_data(ticker: str) -> pd.DataFrame:
+    """Get stock data from Yahoo Finance"""
+    stock_data = admission.fetch(lambda timeout: yf.download(ticker, start='2020-01-01', timeout=timeout))
+    return stock_data[['Close']]
+
+
+def stationary_check(close_price: pd.Series) -> float:
+    """Check if the time series is stationary using ADF test"""
+    adf_test = adfuller(close_price.dropna())
+    return round(adf_test[1], 3)
+
+
+def get_rolling_mean(close_price: pd.DataFrame) -> pd.DataFrame:
+    """Calculate 7-day rolling mean of closing prices"""
+    if isinstance(close_price, pd.DataFrame):
+        close_price = close_price['Close']
+    rolling_price = close_price.rolling(window=7).mean().dropna()
+    if not isinstance(rolling_price, pd.DataFrame):
+        rolling_price = rolling_price.to_frame(name='Close')
+    return rolling_price
+
+
+def get_differencing_order(close_price: pd.DataFrame) -> int:
+    """Determine optimal differencing order for stationarity"""
+    if isinstance(close_price, pd.DataFrame):
+        close_price = close_price['Close'].copy()
+    p_value = stationary_check(close_price)
+    d = 0
+    while p_value > 0.05 and d < 2:
+        d += 1
+        close_price = close_price.diff().dropna()
+        p_value = stationary_check(close_price)
+    return d
+
+
+def fit_model(data: np.ndarray, differencing_order: int, steps: int = 30) -> np.ndarray:
+    """Fit ARIMA model and generate forecasts"""
+    model = ARIMA(data, order=(ARIMA_P, differencing_order, ARIMA_Q))
+    model_fit = model.fit()
+    forecast = model_fit.get_forecast(steps=steps)
+    return forecast.predicted_mean
+
+
+def evaluate_model(original_price: np.ndarray, differencing_order: int) -> float:
+    """Evaluate ARIMA model using RMSE on test data"""
+    if len(original_price) < 60:  # Need enough data for train/test split
+        return 0.0
+
+    train_data = original_price[:-HOLDOUT]
+    test_data = original_price[-HOLDOUT:]
+    predictions = fit_model(train_data, differencing_order, steps=HOLDOUT)
+
+    # Ensure same length for RMSE calculation
+    min_len = min(len(test_data), len(predictions))
+    rmse = np.sqrt(mean_squared_error(test_data[:min_len], predictions[:min_len]))
+    return round(rmse, 2)
+
+
+def scaling(close_price: pd.DataFrame):
+    """Scale the data using StandardScaler"""
+    scaler = StandardScaler()
+    if isinstance(close_price, pd.DataFrame):
+        close_price = close_price['Close'].values
+    scaled_data = scaler.fit_transform(np.array(close_price).reshape(-1, 1))
+    return scaled_data.flatten(), scaler
+
+
+def forecast_index(original_price_df: pd.DataFrame, forecast_steps: int) -> pd.DatetimeIndex:
+    """Daily dates following the last observation"""
+    last_date = original_price_df.index[-1]
+    return pd.date_range(start=last_date + timedelta(days=1), periods=forecast_steps, freq='D')
+
+
+def get_forecast(scaled_data: np.ndarray, original_price_df: pd.DataFrame,
+                 differencing_order: int, forecast_steps: int = 30) -> pd.DataFrame:
+    """Generate forecast using ARIMA model"""
+    predictions = fit_model(scaled_data, differencing_order, steps=forecast_steps)
+    return pd.DataFrame(predictions, index=forecast_index(original_price_df, forecast_steps), columns=['Close'])
+
+
+def inverse_scaling(scaler: StandardScaler, scaled_data) -> np.ndarray:
+    """Inverse transform scaled data back to original scale"""
+    if isinstance(scaled_data, (pd.Series, pd.DataFrame)):
+        scaled_data = scaled_data.values
+    return scaler.inverse_transform(np.array(scaled_data).reshape(-1, 1)).flatten()
+
+
+def drift_forecast(y: np.ndarray, steps: int) -> np.ndarray:
+    """Random walk with drift: extend the average historical step"""
+    slope = (y[-1] - y[0]) / (len(y) - 1)
+    return y[-1] + slope * np.arange(1, steps + 1)
+
+
+def holt_forecast(y: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Holt linear-trend exponential smoothing. Every (alpha, beta) pair of the
+    grid is filtered simultaneously and the pair with the lowest one-step
+    squared error produces the forecast.
+    """
+    level = np.full(_HOLT_ALPHA.shape, y[0])
+    trend = np.full(_HOLT_ALPHA.shape, y[1] - y[0])
+    sse = np.zeros(_HOLT_ALPHA.shape)
+    for value in y[1:]:
+        error = value - (level + trend)
+        sse += error * error
+        level = level + trend + _HOLT_ALPHA * error
+        trend = trend + _HOLT_ALPHA * _HOLT_BETA * error
+    best = int(np.argmin(sse))
+    return level[best] + trend[best] * np.arange(1, steps + 1)
+
+
+def ar_forecast(y: np.ndarray, steps: int, lags: int = AR_LAGS) -> np.ndarray:
+    """AR(lags) with intercept on first differences, fitted by ordinary least squares"""
+    diffs = np.diff(y)
+    lagged = sliding_window_view(diffs, lags)[:-1]
+    design = np.column_stack([np.ones(len(lagged)), lagged])
+    coef, *_ = np.linalg.lstsq(design, diffs[lags:], rcond=None)
+    window = list(diffs[-lags:])
+    predicted = []
+    for _ in range(steps):
+        step = coef[0] + coef[1:] @ window[-lags:]
+        predicted.append(step)
+        window.append(step)
+    return y[-1] + np.cumsum(predicted)
+
+
+FAST_MODELS = {
+    "Holt": holt_forecast,
+    "AR-OLS": ar_forecast,
+    "Drift": drift_forecast,
+}
+
+
+def fast_forecast(scaled_data: np.ndarray, steps: int) -> Dict[str, Any]:
+    """Pick the fast model with the lowest holdout RMSE and forecast with it"""
+    holdout = min(HOLDOUT, len(scaled_data) // 5)
+    train, test = scaled_data[:-holdout], scaled_data[-holdout:]
+    scores = {}
+    for name, model in FAST_MODELS.items():
+        if len(train) <= AR_LAGS + 2 and name == "AR-OLS":
+            continue
+        predictions = model(train, holdout)
+        scores[name] = float(np.sqrt(np.mean((test - predictions) ** 2)))
+    best = min(scores, key=scores.get)
+    return {
+        "model_type": best,
+        "order": f"AR({AR_LAGS}) on first differences" if best == "AR-OLS" else None,
+        "rmse": round(scores[best], 2),
+        "forecast": FAST_MODELS[best](scaled_data, steps),
+    }
+
+
+def arima_forecast(rolling_price: pd.DataFrame, scaled_data: np.ndarray, steps: int) -> Dict[str, Any]:
+    """Full maximum-likelihood ARIMA path with ADF-selected differencing"""
+    global _arima_ms_per_point, _arima_measured_at
+    started = time.perf_counter()
+    differencing_order = get_differencing_order(rolling_price)
+    admission.check_deadline()
+    rmse = evaluate_model(scaled_data, differencing_order)
+    admission.check_deadline()
+    predictions = fit_model(scaled_data, differencing_order, steps=steps)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _arima_ms_per_point = 0.7 * estimated_arima_ms(1) + 0.3 * elapsed_ms / len(scaled_data)
+    _arima_measured_at = time.monotonic()
+    return {
+        "model_type": "ARIMA",
+        "order": f"({ARIMA_P}, {differencing_order}, {ARIMA_Q})",
+        "rmse": float(rmse),
+        "forecast": np.asarray(predictions),
+        "stationarity_achieved": differencing_order <= 2,
+    }
+
+
+def estimated_arima_ms(n_points: int) -> float:
+    age = time.monotonic() - _arima_measured_at
+    return _arima_ms_per_point * 0.5 ** (age / ESTIMATE_HALF_LIFE_SECONDS) * n_points
+
+
+def forecast(rolling_price: pd.DataFrame, steps: int, mode: str = "auto",
+             latency_budget_ms: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Forecast the smoothed close series.
+
+    "fast" serves the best closed-form model, "full" always fits ARIMA, and
+    "auto" fits ARIMA only when its estimated cost fits the remaining latency
+    budget, falling back to the fast model otherwise. The returned dict holds
+    the forecast in price units and describes the model that served it.
+    """
+    if mode not in MODES:
+        raise ForecastInputError(f"mode must be one of {', '.join(MODES)}")
+    started = time.perf_counter()
+    if len(rolling_price) < 10:
+        raise ForecastInputError("Not enough price history to forecast")
+    budget = DEFAULT_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+    deadline = admission.remaining()
+    if deadline is not None:
+        budget = min(budget, int(deadline * 1000))
+    scaled_data, scaler = scaling(rolling_price)
+
+    result = None
+    skipped_reason = None
+    if mode != "fast":
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if mode == "full" or elapsed_ms + estimated_arima_ms(len(scaled_data)) <= budget:
+            result = arima_forecast(rolling_price, scaled_data, steps)
+        else:
+            skipped_reason = "ARIMA estimated to exceed latency budget"
+    if result is None:
+        result = fast_forecast(scaled_data, steps)
+
+    result["forecast"] = inverse_scaling(scaler, result["forecast"])
+    result["index"] = forecast_index(rolling_price, steps)
+    result["mode"] = mode
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["latency_budget_ms"] = budget
+    if skipped_reason:
+        result["arima_skipped"] = skipped_reason
+    return result
@@ -0,0 +1,296 @@
+"""
+Compact in-memory store for intraday bars.
+
+Bars are kept per symbol in one chunk per trading day. Inside a chunk:
+  * timestamps are exchange-local wall-clock epoch seconds, stored as the
+    first value plus int32 deltas;
+  * prices are integers in 1/PRICE_SCALE units: the close as the first value
+    plus deltas, and open/high/low as offsets from the close;
+  * volumes are int64;
+and every array is zlib-compressed. Chunks are only decoded for the time
+range being read, and resampling aggregates the integer arrays before they
+are converted to floats.
+
+Memory is bounded by keeping at most RETENTION_SESSIONS trading days per
+symbol and at most MAX_SYMBOLS symbols, evicting the least recently used one.
+"""
+import bisect
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from services import admission
+
+PRICE_SCALE = 10000  # four decimal places
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": 86400}
+# Trading sessions covered by analysis periods served from intraday bars, matching
+# the trading-day counting of the daily path; yfinance keeps about 30 days of 1m data
+INTRADAY_PERIODS = {"1d": 1, "5d": 5, "1mo": 21}
+REFRESH_SECONDS = 60
+# yfinance serves 1m bars for about the last 30 days, at most 7 days per request
+BACKFILL_DAYS = 29
+FETCH_WINDOW_DAYS = 7
+RETENTION_SESSIONS = max(INTRADAY_PERIODS.values())
+MAX_SYMBOLS = 100
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class _Chunk(NamedTuple):
+    day: int
+    start: int
+    end: int
+    rows: int
+    first_ts: int
+    first_close: int
+    price_dtype: str
+    ts_blob: bytes
+    price_blob: bytes
+    volume_blob: bytes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.ts_blob) + len(self.price_blob) + len(self.volume_blob)
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """int32 when every value fits, otherwise int64"""
+    info = np.iinfo(np.int32)
+    if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+        return values.astype(np.int32)
+    return values.astype(np.int64)
+
+
+def _encode(day: int, ts: np.ndarray, prices: np.ndarray, volume: np.ndarray) -> _Chunk:
+    """Encode one day of bars. prices is (4, rows) int64 ticks in OHLC order."""
+    close = prices[3]
+    price_parts = np.concatenate([np.diff(close), prices[0] - close, prices[1] - close, prices[2] - close])
+    price_parts = _narrow(price_parts)
+    return _Chunk(
+        day=day,
+        start=int(ts[0]),
+        end=int(ts[-1]),
+        rows=len(ts),
+        first_ts=int(ts[0]),
+        first_close=int(close[0]),
+        price_dtype=price_parts.dtype.str,
+        ts_blob=zlib.compress(np.diff(ts).astype(np.int32).tobytes()),
+        price_blob=zlib.compress(price_parts.tobytes()),
+        volume_blob=zlib.compress(volume.astype(np.int64).tobytes()),
+    )
+
+
+def _decode(chunk: _Chunk) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (timestamps, OHLC ticks of shape (4, rows), volumes) for a chunk"""
+    n = chunk.rows
+    deltas = np.frombuffer(zlib.decompress(chunk.ts_blob), dtype=np.int32)
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = chunk.first_ts
+    np.cumsum(deltas, out=ts[1:])
+    ts[1:] += chunk.first_ts
+
+    parts = np.frombuffer(zlib.decompress(chunk.price_blob), dtype=np.dtype(chunk.price_dtype)).astype(np.int64)
+    close = np.empty(n, dtype=np.int64)
+    close[0] = chunk.first_close
+    np.cumsum(parts[:n - 1], out=close[1:])
+    close[1:] += chunk.first_close
+    offsets = parts[n - 1:].reshape(3, n)
+    prices = np.vstack([offsets + close, close])
+
+    volume = np.frombuffer(zlib.decompress(chunk.volume_blob), dtype=np.int64)
+    return ts, prices, volume
+
+
+def resample(ts: np.ndarray, prices: np.ndarray, volume: np.ndarray, interval: str):
+    """Aggregate consecutive bars into interval buckets with segment reductions"""
+    width = INTERVALS[interval]
+    if width == 60 or len(ts) == 0:
+        return ts, prices, volume
+    bucket = ts // width
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(bucket)) + 1])
+    ends = np.append(starts[1:], len(ts)) - 1
+    out = np.vstack([
+        prices[0, starts],
+        np.maximum.reduceat(prices[1], starts),
+        np.minimum.reduceat(prices[2], starts),
+        prices[3, ends],
+    ])
+    return bucket[starts] * width, out, np.add.reduceat(volume, starts)
+
+
+class IntradayStore:
+    """Per-process store of encoded 1-minute bars"""
+
+    def __init__(self, max_symbols: int = MAX_SYMBOLS, retention: int = RETENTION_SESSIONS):
+        self.max_symbols = max_symbols
+        self.retention = retention
+        self._chunks: "OrderedDict[str, List[_Chunk]]" = OrderedDict()
+        self._fetched: Dict[str, float] = {}
+        self._refreshing: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _touch(self, symbol: str) -> None:
+        """Mark symbol as recently used and evict the least recently used symbols over the limit"""
+        self._chunks.move_to_end(symbol)
+        while len(self._chunks) > self.max_symbols:
+            evicted, _ = self._chunks.popitem(last=False)
+            self._fetched.pop(evicted, None)
+            self._refreshing.pop(evicted, None)
+
+    def ingest(self, symbol: str, bars: pd.DataFrame) -> int:
+        """
+        Add 1-minute OHLCV bars (DatetimeIndex) for symbol. Bars before the last
+        stored timestamp are ignored, and a bar at that timestamp replaces the
+        stored one, since the latest bar is usually still forming when fetched.
+        Only the last `retention` trading days are kept. Returns the number of
+        bars written.
+        """
+        if bars.empty:
+            return 0
+        bars = bars[COLUMNS].dropna(subset=["Close"])
+        if bars.empty:
+            return 0
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        ts = index.values.astype("datetime64[s]").astype(np.int64)
+        prices = np.round(bars[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64).T * PRICE_SCALE).astype(np.int64)
+        volume = np.nan_to_num(bars["Volume"].to_numpy(dtype=np.float64)).astype(np.int64)
+
+        order = np.argsort(ts, kind="stable")
+        ts, prices, volume = ts[order], prices[:, order], volume[order]
+
+        with self._lock:
+            chunks = self._chunks.setdefault(symbol, [])
+            self._touch(symbol)
+            if chunks:
+                fresh = ts >= chunks[-1].end
+                ts, prices, volume = ts[fresh], prices[:, fresh], volume[fresh]
+            if len(ts) == 0:
+                return 0
+
+            days = ts // 86400
+            bounds = np.concatenate([[0], np.flatnonzero(np.diff(days)) + 1, [len(ts)]])
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                day = int(days[lo])
+                day_ts, day_prices, day_volume = ts[lo:hi], prices[:, lo:hi], volume[lo:hi]
+                if chunks and chunks[-1].day == day:
+                    # Extend today's partial chunk, replacing its last bar if it was re-sent
+                    old_ts, old_prices, old_volume = _decode(chunks.pop())
+                    keep = old_ts < day_ts[0]
+                    day_ts = np.concatenate([old_ts[keep], day_ts])
+                    day_prices = np.hstack([old_prices[:, keep], day_prices])
+                    day_volume = np.concatenate([old_volume[keep], day_volume])
+                chunks.append(_encode(day, day_ts, day_prices, day_volume))
+
+            del chunks[:-self.retention]
+            return len(ts)
+
+    def refresh(self, symbol: str) -> None:
+        """
+        Download 1-minute bars from Yahoo Finance unless fetched recently. The
+        first fetch backfills BACKFILL_DAYS; later ones resume from the day of
+        the last stored bar. Requests are split into FETCH_WINDOW_DAYS windows.
+        Concurrent refreshes of the same symbol wait for the one in flight
+        instead of downloading the same bars again.
+        """
+        with self._lock:
+            lock = self._refreshing.setdefault(symbol, threading.Lock())
+        left = admission.remaining()
+        if not lock.acquire(timeout=-1 if left is None else left):
+            raise admission.DeadlineExceeded()
+        try:
+            if time.time() - self._fetched.get(symbol, 0) < REFRESH_SECONDS:
+                return
+            self._download(symbol)
+        finally:
+            lock.release()
+
+    def _download(self, symbol: str) -> None:
+        """Fetch bars from the last stored day, or BACKFILL_DAYS ago, up to now"""
+        now = time.time()
+        today = pd.Timestamp.utcnow().tz_localize(None).normalize()
+        start = today - pd.Timedelta(days=BACKFILL_DAYS)
+        last = self.last_timestamp(symbol)
+        if last is not None:
+            start = max(start, pd.Timestamp(last, unit="s").normalize())
+        ticker = yf.Ticker(symbol)
+        while start <= today:
+            end = start + pd.Timedelta(days=FETCH_WINDOW_DAYS)
+            # The last window runs up to now
+            bars = admission.fetch(lambda timeout: ticker.history(
+                start=start, end=end if end <= today else None, interval="1m", timeout=timeout))
+            self.ingest(symbol, bars)
+            start = end
+        self._fetched[symbol] = now
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        chunks = self._chunks.get(symbol)
+        return chunks[-1].end if chunks else None
+
+    def bars(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None,
+             interval: str = "1m") -> pd.DataFrame:
+        """
+        Decode bars with start <= timestamp <= end (local epoch seconds) and
+        resample them to interval. Only chunks overlapping the range are decoded.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+        with self._lock:
+            chunks = list(self._chunks.get(symbol, []))
+            if symbol in self._chunks:
+                self._touch(symbol)
+        lo_ts = -np.inf if start is None else start
+        hi_ts = np.inf if end is None else end
+        first = bisect.bisect_left([c.end for c in chunks], lo_ts)
+        selected = [c for c in chunks[first:] if c.start <= hi_ts]
+
+        if selected:
+            decoded = [_decode(c) for c in selected]
+            ts = np.concatenate([d[0] for d in decoded])
+            prices = np.hstack([d[1] for d in decoded])
+            volume = np.concatenate([d[2] for d in decoded])
+            mask = (ts >= lo_ts) & (ts <= hi_ts)
+            ts, prices, volume = resample(ts[mask], prices[:, mask], volume[mask], interval)
+        else:
+            ts, prices, volume = np.empty(0, np.int64), np.empty((4, 0), np.int64), np.empty(0, np.int64)
+
+        frame = pd.DataFrame(prices.T / PRICE_SCALE, columns=COLUMNS[:4],
+                             index=pd.DatetimeIndex(ts.astype("datetime64[s]"), name="Datetime"))
+        frame["Volume"] = volume
+        return frame
+
+    def history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """Bars for the last N trading sessions of an analysis period"""
+        if period not in INTRADAY_PERIODS:
+            raise ValueError(f"Intraday analysis supports period {', '.join(INTRADAY_PERIODS)}")
+        self.refresh(symbol)
+        with self._lock:
+            chunks = self._chunks.get(symbol, [])[-INTRADAY_PERIODS[period]:]
+        if not chunks:
+            return self.bars(symbol, interval=interval)
+        # One chunk per trading day, so the period starts at the first selected session
+        return self.bars(symbol, chunks[0].start, None, interval)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Encoded size per symbol next to the size of the same bars as a float64 frame"""
+        with self._lock:
+            symbols = [(symbol, list(chunks)) for symbol, chunks in self._chunks.items()]
+        result = {}
+        for symbol, chunks in symbols:
+            rows = sum(c.rows for c in chunks)
+            result[symbol] = {
+                "bars": rows,
+                "chunks": len(chunks),
+                "encoded_bytes": sum(c.nbytes for c in chunks),
+                "dataframe_bytes": rows * (len(COLUMNS) + 1) * 8,
+            }
+        return result
+
+
+store = IntradayStore()
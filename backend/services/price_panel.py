@@ -0,0 +1,308 @@
+"""
+Shared-memory price panel for worker processes.
+
+A publisher (normally the parent process) writes closes and volumes for the
+tracked universe into a shared memory segment; workers attach to it by name
+and read the arrays in place, without pickling or copying.
+
+Refresh protocol:
+  * Every refresh is written to a brand new data segment ``<name>_v<version>``
+    that is never modified after it is published.
+  * A tiny control segment ``<name>`` holds the current version. It is only
+    updated after the new data segment is completely written.
+  * The previous data segment is then unlinked. Workers that already mapped
+    it keep a valid view, and workers that race the unlink simply re-read the
+    control version and attach to the new segment.
+
+Readers therefore only ever see a fully written panel. A reader's mapping
+stays alive until the panel and every array taken from it are garbage
+collected, so arrays remain valid after the panel is closed or refreshed.
+A single publisher per panel name is assumed.
+"""
+import json
+import threading
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+DEFAULT_NAME = "stocklyzer_panel"
+
+_MAGIC = 0x53544B50  # "STKP"
+_ALIGN = 64
+_HEADER = np.dtype([
+    ("magic", "<u4"), ("dtype", "<u4"), ("version", "<i8"),
+    ("n_dates", "<i8"), ("n_symbols", "<i8"), ("symbols_len", "<i8"),
+])
+_CONTROL = np.dtype([("magic", "<u4"), ("pad", "<u4"), ("version", "<i8")])
+_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f8")}
+_DTYPE_CODES = {v: k for k, v in _DTYPES.items()}
+
+# Guards the temporary resource tracker patch in _attach_segment
+_tracker_lock = threading.Lock()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _layout(n_dates: int, n_symbols: int, dtype: np.dtype, symbols_len: int) -> Tuple[Dict[str, int], int]:
+    """Byte offsets of every section of a data segment and its total size"""
+    offsets = {}
+    offset = _aligned(_HEADER.itemsize)
+    offsets["dates"] = offset
+    offset = _aligned(offset + n_dates * 4)
+    offsets["closes"] = offset
+    offset = _aligned(offset + n_dates * n_symbols * dtype.itemsize)
+    offsets["volumes"] = offset
+    offset = _aligned(offset + n_dates * n_symbols * dtype.itemsize)
+    offsets["symbols"] = offset
+    return offsets, max(offset + symbols_len, 1)
+
+
+def _segment_name(name: str, version: int) -> str:
+    return f"{name}_v{version}"
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach without registering the segment with the resource tracker, which
+    would otherwise unlink the publisher's segment when a reader exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        pass
+    with _tracker_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _map_segment(shm: shared_memory.SharedMemory) -> np.ndarray:
+    """
+    Byte array over a segment. Arrays derived from it keep the mapping alive;
+    the segment is closed only once the last of them is garbage collected.
+    """
+    raw = np.frombuffer(shm.buf, dtype=np.uint8)
+    # Process exit unmaps the segment anyway, and closing it then would fail while views are alive
+    weakref.finalize(raw.base, shm.close).atexit = False
+    return raw
+
+
+def _read_control(name: str) -> int:
+    control = _attach_segment(name)
+    try:
+        record = np.ndarray((), dtype=_CONTROL, buffer=control.buf)
+        if record["magic"] != _MAGIC:
+            raise ValueError(f"Shared memory segment {name} is not a price panel")
+        version = int(record["version"])
+        del record
+        return version
+    finally:
+        control.close()
+
+
+def _unlink(name: str) -> None:
+    """Remove a leftover segment if it exists"""
+    try:
+        stale = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    stale.unlink()
+    stale.close()
+
+
+class PricePanel:
+    """Read-only, zero-copy view of a published price panel"""
+
+    def __init__(self, name: str, shm: shared_memory.SharedMemory, version: int):
+        self.name = name
+        self.version = version
+        self._raw = _map_segment(shm)
+        header = self._raw[:_HEADER.itemsize].view(_HEADER)[0]
+        if header["magic"] != _MAGIC or header["version"] != version:
+            raise ValueError(f"Price panel segment {shm.name} does not hold version {version}")
+        n_dates, n_symbols = int(header["n_dates"]), int(header["n_symbols"])
+        dtype = _DTYPES[int(header["dtype"])]
+        symbols_len = int(header["symbols_len"])
+        del header
+        offsets, _ = _layout(n_dates, n_symbols, dtype, symbols_len)
+
+        self.dates = self._view((n_dates,), np.dtype("<i4"), offsets["dates"])
+        self.closes = self._view((n_dates, n_symbols), dtype, offsets["closes"])
+        self.volumes = self._view((n_dates, n_symbols), dtype, offsets["volumes"])
+        raw = self._raw[offsets["symbols"]:offsets["symbols"] + symbols_len].tobytes()
+        self.symbols: List[str] = json.loads(raw.decode()) if raw else []
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+
+    def _view(self, shape, dtype, offset) -> np.ndarray:
+        size = int(np.prod(shape)) * dtype.itemsize
+        array = self._raw[offset:offset + size].view(dtype).reshape(shape)
+        array.flags.writeable = False
+        return array
+
+    def column(self, symbol: str) -> int:
+        try:
+            return self.index[symbol]
+        except KeyError:
+            raise KeyError(f"{symbol} is not in the price panel") from None
+
+    def close_prices(self, symbol: str) -> np.ndarray:
+        """Closes for one symbol as a strided view into shared memory"""
+        return self.closes[:, self.column(symbol)]
+
+    def close_series(self, symbol: str) -> pd.Series:
+        """Closes for one symbol as a pandas Series indexed by date"""
+        return pd.Series(self.close_prices(symbol), index=self.date_index(), name="Close")
+
+    def date_index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.dates.astype("datetime64[D]"), name="Date")
+
+    def is_stale(self) -> bool:
+        return _read_control(self.name) != self.version
+
+    def refresh(self) -> "PricePanel":
+        """Return self if current, otherwise release it and attach to the latest version"""
+        if not self.is_stale():
+            return self
+        self.close()
+        return attach(self.name)
+
+    def close(self) -> None:
+        """
+        Release the panel's own references to shared memory. Arrays obtained
+        from it stay valid; the segment is unmapped once they are gone too.
+        """
+        self.dates = self.closes = self.volumes = self._raw = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(name: str = DEFAULT_NAME, retries: int = 5) -> PricePanel:
+    """Attach to the currently published version of a price panel"""
+    for attempt in range(retries):
+        version = _read_control(name)
+        if version == 0:
+            raise RuntimeError(f"Price panel {name} has not been published yet")
+        try:
+            shm = _attach_segment(_segment_name(name, version))
+        except FileNotFoundError:
+            # A refresh unlinked this version between reading the control block and attaching
+            time.sleep(0.01 * (attempt + 1))
+            continue
+        return PricePanel(name, shm, version)
+    raise RuntimeError(f"Could not attach to price panel {name}: it is being refreshed too often")
+
+
+class PricePanelPublisher:
+    """Owns a price panel and publishes new versions of it"""
+
+    def __init__(self, name: str = DEFAULT_NAME, dtype=np.float32):
+        self.name = name
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        if self.dtype not in _DTYPE_CODES:
+            raise ValueError("Price panel dtype must be float32 or float64")
+        self.version = 0
+        self._data: Optional[shared_memory.SharedMemory] = None
+        try:
+            self._control = shared_memory.SharedMemory(name=name, create=True, size=_CONTROL.itemsize)
+        except FileExistsError:
+            # Left behind by a publisher that did not shut down cleanly. Remove it
+            # with its current data segment and continue numbering after it, so new
+            # versions never collide with segments readers may still have open.
+            self.version = _read_control(name)
+            _unlink(_segment_name(name, self.version))
+            _unlink(name)
+            self._control = shared_memory.SharedMemory(name=name, create=True, size=_CONTROL.itemsize)
+        record = np.ndarray((), dtype=_CONTROL, buffer=self._control.buf)
+        record["magic"] = _MAGIC
+        record["version"] = 0
+        del record
+
+    def publish(self, closes: pd.DataFrame, volumes: Optional[pd.DataFrame] = None) -> int:
+        """
+        Write a new version of the panel from wide frames (dates x symbols)
+        and make it visible to readers. Returns the new version number.
+        """
+        if volumes is None:
+            volumes = pd.DataFrame(np.nan, index=closes.index, columns=closes.columns)
+        volumes = volumes.reindex(index=closes.index, columns=closes.columns)
+        symbols = [str(c) for c in closes.columns]
+        symbols_raw = json.dumps(symbols).encode()
+        n_dates, n_symbols = closes.shape
+        offsets, size = _layout(n_dates, n_symbols, self.dtype, len(symbols_raw))
+
+        version = self.version + 1
+        segment = _segment_name(self.name, version)
+        try:
+            shm = shared_memory.SharedMemory(name=segment, create=True, size=size)
+        except FileExistsError:
+            # Partially written by a publisher that crashed before publishing it
+            _unlink(segment)
+            shm = shared_memory.SharedMemory(name=segment, create=True, size=size)
+        buf = shm.buf
+        dates = pd.DatetimeIndex(closes.index).tz_localize(None).values.astype("datetime64[D]").astype("<i4")
+        np.ndarray((n_dates,), dtype="<i4", buffer=buf, offset=offsets["dates"])[:] = dates
+        np.ndarray((n_dates, n_symbols), dtype=self.dtype, buffer=buf,
+                   offset=offsets["closes"])[:] = closes.to_numpy(dtype=self.dtype)
+        np.ndarray((n_dates, n_symbols), dtype=self.dtype, buffer=buf,
+                   offset=offsets["volumes"])[:] = volumes.to_numpy(dtype=self.dtype)
+        buf[offsets["symbols"]:offsets["symbols"] + len(symbols_raw)] = symbols_raw
+        header = np.ndarray((), dtype=_HEADER, buffer=buf)
+        header["dtype"] = _DTYPE_CODES[self.dtype]
+        header["version"] = version
+        header["n_dates"] = n_dates
+        header["n_symbols"] = n_symbols
+        header["symbols_len"] = len(symbols_raw)
+        header["magic"] = _MAGIC
+        del header, buf
+
+        # Publish: readers switch to the new segment once the control version changes
+        record = np.ndarray((), dtype=_CONTROL, buffer=self._control.buf)
+        record["version"] = version
+        del record
+
+        self._release_data()
+        self._data = shm
+        self.version = version
+        return version
+
+    def _release_data(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data.unlink()
+            self._data = None
+
+    def close(self) -> None:
+        """Unlink every segment of this panel"""
+        self._release_data()
+        if self._control is not None:
+            self._control.close()
+            self._control.unlink()
+            self._control = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def download_universe(symbols: List[str], period: str = "5y") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Download aligned closes and volumes (dates x symbols) for publishing"""
+    data = yf.download(symbols, period=period)
+    closes = data["Close"].reindex(columns=symbols)
+    volumes = data["Volume"].reindex(columns=symbols)
+    return closes, volumes
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Results only change when new bars arrive, so clients keep their copy and
+# revalidate it with If-None-Match on every use.
+CACHE_CONTROL = "private, no-cache"
+
+DEFAULT_TTL = int(os.getenv("STOCKLYZER_CACHE_TTL", "86400"))
+DEFAULT_PATH = os.getenv(
+    "STOCKLYZER_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "stocklyzer_cache.sqlite3"),
+)
+
+CacheEntry = Tuple[str, bytes]
+
+
+class SQLiteCache:
+    """Result cache stored in a SQLite file shared by all worker processes"""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, etag TEXT NOT NULL, "
+                "body BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, body, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        return row[0], bytes(row[1])
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, body, expires) VALUES (?, ?, ?, ?)",
+                (key, etag, body, now + self.ttl),
+            )
+            conn.execute("DELETE FROM responses WHERE expires < ?", (now,))
+
+
+class RedisCache:
+    """Result cache stored in a Redis-compatible server"""
+
+    def __init__(self, url: str, ttl: int = DEFAULT_TTL):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        etag, body = self.client.hmget(key, "etag", "body")
+        if etag is None or body is None:
+            return None
+        return etag.decode(), body
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"etag": etag, "body": body})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+
+def create_cache():
+    """Build the cache backend selected by STOCKLYZER_CACHE_BACKEND (sqlite, redis or none)"""
+    backend = os.getenv("STOCKLYZER_CACHE_BACKEND", "sqlite").lower()
+    if backend == "none":
+        return None
+    if backend == "redis":
+        try:
+            return RedisCache(os.getenv("STOCKLYZER_CACHE_URL", "redis://localhost:6379/0"))
+        except ImportError:
+            logger.warning("redis package not installed, falling back to SQLite response cache")
+    try:
+        return SQLiteCache()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cannot open response cache at %s, caching disabled: %s", DEFAULT_PATH, e)
+        return None
+
+
+cache = create_cache()
+
+
+def make_key(namespace: str, params: Dict[str, Any], data: pd.DataFrame) -> str:
+    """
+    Derive a cache key from the request parameters and the last bar of the
+    underlying data. The bar's values are part of the key because the current
+    day's bar keeps changing until the market closes.
+    """
+    payload = json.dumps(
+        {
+            "params": jsonable_encoder(params),
+            "last_bar": str(data.index[-1]),
+            "last_values": [str(value) for value in data.iloc[-1].tolist()],
+        },
+        sort_keys=True,
+    )
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag over the exact response bytes"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def serve(request: Request, key: str, compute: Callable[[], Any]) -> Response:
+    """
+    Return the cached result for key, computing and storing it on a miss.
+    A GET whose If-None-Match holds the current ETag gets 304 without a body;
+    other methods get 412 Precondition Failed, as required for non-GET requests.
+    """
+    entry = None
+    if cache is not None:
+        try:
+            entry = cache.get(key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+
+    if entry is None:
+        body = JSONResponse(content=jsonable_encoder(compute())).body
+        etag = make_etag(body)
+        if cache is not None:
+            try:
+                cache.set(key, etag, body)
+            except Exception as e:
+                logger.warning("Response cache write failed: %s", e)
+    else:
+        etag, body = entry
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        status = 304 if request.method in ("GET", "HEAD") else 412
+        return Response(status_code=status, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -52,6 +52,10 @@ const StockAnalysis = () => {
   }
 
   const calculatePriceChange = () => {
+    // price_data may be downsampled, so prefer the change computed from the full history
+    if (results?.summary?.price_change != null) {
+      return { change: results.summary.price_change, percentage: results.summary.percent_change }
+    }
     if (!results?.price_data || results.price_data.length < 2) return { change: 0, percentage: 0 }
     
     const latest = results.price_data[results.price_data.length - 1].price
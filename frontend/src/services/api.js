@@ -7,6 +7,8 @@ const api = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // Repeat list parameters (stocks=AAPL&stocks=MSFT) as FastAPI expects
+  paramsSerializer: { indexes: null },
 })
 
 // Request interceptor for logging
@@ -31,13 +33,23 @@ api.interceptors.response.use(
   }
 )
 
+// Charts are a few hundred pixels wide; the backend downsamples long histories to this many points
+export const CHART_MAX_POINTS = 500
+
+// Analysis, CAPM and prediction use the GET variants of their endpoints so the browser
+// cache revalidates repeated requests with If-None-Match and unchanged results come back
+// as 304 Not Modified instead of being downloaded again.
+
 // CAPM Calculator API
 export const capmAPI = {
-  calculate: async (stocks, years = 1) => {
+  calculate: async (stocks, years = 1, maxPoints = CHART_MAX_POINTS) => {
     try {
-      const response = await api.post('/capm/calculate', {
-        stocks,
-        years
+      const response = await api.get('/capm/calculate', {
+        params: {
+          stocks,
+          years,
+          max_points: maxPoints
+        }
       })
       return response.data
     } catch (error) {
@@ -46,13 +58,50 @@ export const capmAPI = {
   }
 }
 
+// Portfolio Analytics API
+export const portfolioAPI = {
+  analyze: async (stocks, years = 1, frontierPoints = 50) => {
+    try {
+      const response = await api.post('/portfolio/analyze', {
+        stocks,
+        years,
+        frontier_points: frontierPoints
+      })
+      return response.data
+    } catch (error) {
+      throw new Error(error.response?.data?.detail || 'Failed to analyze portfolio')
+    }
+  }
+}
+
+// Backtesting API
+export const backtestAPI = {
+  run: async (symbols, strategy = 'ma_crossover', parameters = {}, period = '5y') => {
+    try {
+      const response = await api.post('/backtest/run', {
+        symbols,
+        strategy,
+        parameters,
+        period
+      })
+      return response.data
+    } catch (error) {
+      throw new Error(error.response?.data?.detail || 'Failed to run backtest')
+    }
+  }
+}
+
 // Stock Analysis API
 export const stockAnalysisAPI = {
-  analyze: async (symbol, period = '1y') => {
+  analyze: async (symbol, period = '1y', maxPoints = CHART_MAX_POINTS, interval = '1d') => {
     try {
-      const response = await api.post('/analysis/analyze', {
-        symbol,
-        period
+      const response = await api.get('/analysis/analyze', {
+        params: {
+          symbol,
+          period,
+          max_points: maxPoints,
+          interval
+        }
       })
       return response.data
     } catch (error) {
@@ -63,11 +112,14 @@ export const stockAnalysisAPI = {
 
 // Stock Prediction API
 export const stockPredictionAPI = {
-  predict: async (symbol, days = 30) => {
+  predict: async (symbol, days = 30, mode = 'auto') => {
     try {
-      const response = await api.post('/prediction/predict', {
-        symbol,
-        days
+      const response = await api.get('/prediction/predict', {
+        params: {
+          symbol,
+          days,
+          mode
+        }
       })
       return response.data
     } catch (error) {